@@ -13,7 +13,7 @@ class Agent:
         """Return one of: 'up', 'down', 'left', 'right', 'stay'"""
 
         #get my position
-        me = tuple(state["agent1_pos"] if agent_id == 1 else state["agent2_pos"])
+        me = tuple(state["my_pos"])
         #get grid size
         grid_size = tuple(state.get("gridsize", (10,10)))
 
@@ -37,9 +37,6 @@ class Agent:
         safe_moves = []
         unvisited_moves = []
 
-        # who is the opponent label in the local view
-        opp_label = "agent2" if agent_id == 1 else "agent1"
-
         for d, tile in info.items():
             dx, dy = dir_map[d]
             nx, ny = me[0] + dx, me[1] + dy
@@ -53,7 +50,7 @@ class Agent:
                 continue
 
             # agent blocking
-            if tile in ("agent1", "agent2"):
+            if tile.startswith("agent"):
                 # don't walk into the other agent
                 continue
 
@@ -72,7 +69,7 @@ class Agent:
         # simple blocking logic
         # if the opponent is adjacent and we have no unvisited neighbors,
         # stay put to act as a wall and maybe farm +5 / +100
-        opponent_adjacent = any(tile == opp_label for tile in info.values())
+        opponent_adjacent = any(tile and tile.startswith("agent") for tile in info.values())
         if opponent_adjacent and not unvisited_moves:
             return "stay"
     
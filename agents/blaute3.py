@@ -18,7 +18,7 @@ class Agent:
         self.step += 1
 
         #get my position
-        me = tuple(state["agent1_pos"] if agent_id == 1 else state["agent2_pos"])
+        me = tuple(state["my_pos"])
         #get grid size
         grid_size = tuple(state.get("gridsize", (10,10)))
 
@@ -51,7 +51,7 @@ class Agent:
         # directions where we see the opponent in adjacent cells
         adjacent_agent_dirs = [
             d for d, tile in info.items()
-            if tile in ("agent1", "agent2")
+            if tile and tile.startswith("agent")
         ]
 
         if adjacent_agent_dirs:
@@ -164,7 +164,7 @@ class Agent:
                 continue
 
             # agent blocking
-            if tile in ("agent1", "agent2"):
+            if tile.startswith("agent"):
                 continue
 
             # safe move
@@ -0,0 +1,17 @@
+import importlib.util
+import os
+import sys
+
+
+# Kept apart from run_match so headless tools (match_server, stress) can
+# load agents without importing pygame
+def load_agent_from_file(filepath):
+    """Dynamically import the Agent class from a .py file"""
+    agent_dir = os.path.dirname(os.path.abspath(filepath))
+    if agent_dir not in sys.path:
+        sys.path.insert(0, agent_dir)
+
+    spec = importlib.util.spec_from_file_location("student_agent", filepath)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Agent()
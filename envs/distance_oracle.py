@@ -0,0 +1,168 @@
+import numpy as np
+
+
+def bfs_distance_fields(open_mask, sources):
+    """Vectorized BFS from several sources at once.
+
+    Returns an int32 array of shape (len(sources), rows, cols) holding the
+    number of steps from each source to every cell, or -1 if unreachable.
+    """
+    rows, cols = open_mask.shape
+    k = len(sources)
+    xs = np.array([s[0] for s in sources], dtype=np.intp)
+    ys = np.array([s[1] for s in sources], dtype=np.intp)
+    idx = np.arange(k)
+
+    dist = np.full((k, rows, cols), -1, dtype=np.int32)
+    frontier = np.zeros((k, rows, cols), dtype=bool)
+    frontier[idx, xs, ys] = True
+    dist[idx, xs, ys] = 0
+
+    unvisited = np.broadcast_to(open_mask, frontier.shape).copy()
+    unvisited[idx, xs, ys] = False
+
+    grown = np.empty_like(frontier)
+    step = 0
+    while True:
+        # Grow every frontier by one step in all four directions at once
+        grown[...] = False
+        grown[:, 1:, :] |= frontier[:, :-1, :]
+        grown[:, :-1, :] |= frontier[:, 1:, :]
+        grown[:, :, 1:] |= frontier[:, :, :-1]
+        grown[:, :, :-1] |= frontier[:, :, 1:]
+        np.logical_and(grown, unvisited, out=frontier)
+        if not frontier.any():
+            break
+        step += 1
+        dist[frontier] = step
+        unvisited &= ~frontier
+
+    return dist
+
+
+def bfs_distance_field(open_mask, source):
+    """Distance in steps from source to every cell, -1 if unreachable"""
+    return bfs_distance_fields(open_mask, [source])[0]
+
+
+class DistanceOracle:
+    """Precomputed shortest-path distances for a fixed GridWorld map.
+
+    Distance fields from the flag and every spawn are always kept. Small
+    maps also get an exact all-pairs table; larger ones fall back to a set
+    of landmarks (flag, spawns, then farthest-point picks) that give cheap
+    lower/upper bounds, plus exact fields computed on demand and cached.
+    """
+
+    def __init__(self, grid, flag_pos, spawns, num_landmarks=8, all_pairs_limit=1024, cache_size=256):
+        self.open_mask = np.array([[tile != 'wall' for tile in row] for row in grid], dtype=bool)
+        self.flag_pos = tuple(flag_pos)
+        self.spawns = {agent_id: tuple(pos) for agent_id, pos in spawns.items()}
+        self.cache_size = cache_size
+        self._cache = {}
+
+        # Flag and spawn fields in one batched BFS
+        sources = [self.flag_pos]
+        for pos in self.spawns.values():
+            if pos not in sources:
+                sources.append(pos)
+        fields = bfs_distance_fields(self.open_mask, sources)
+        self.fields = {src: fields[i] for i, src in enumerate(sources)}
+        self.flag_field = self.fields[self.flag_pos]
+        self.spawn_fields = {agent_id: self.fields[pos] for agent_id, pos in self.spawns.items()}
+
+        # Farthest-point landmarks: each new one is the open cell farthest
+        # from all landmarks picked so far
+        self.landmarks = list(sources)
+        unreached = np.iinfo(np.int32).max
+        nearest = np.where(fields >= 0, fields, unreached).min(axis=0)
+        nearest[nearest == unreached] = -1
+        while len(self.landmarks) < num_landmarks:
+            x, y = np.unravel_index(np.argmax(nearest), nearest.shape)
+            if nearest[x, y] <= 0:
+                break
+            landmark = (int(x), int(y))
+            field = bfs_distance_field(self.open_mask, landmark)
+            self.fields[landmark] = field
+            self.landmarks.append(landmark)
+            nearest = np.where(field >= 0, np.minimum(nearest, field), nearest)
+        self.landmark_fields = np.stack([self.fields[lm] for lm in self.landmarks])
+
+        # Exact table for small maps, indexed by open-cell number
+        self.cell_index = np.full(self.open_mask.shape, -1, dtype=np.int32)
+        cells = np.argwhere(self.open_mask)
+        self.cell_index[self.open_mask] = np.arange(len(cells), dtype=np.int32)
+        self.pairs = None
+        if len(cells) <= all_pairs_limit:
+            self.pairs = self._all_pairs(cells)
+
+    def _all_pairs(self, cells, chunk=64):
+        n = len(cells)
+        dtype = np.int16 if n < np.iinfo(np.int16).max else np.int32
+        pairs = np.empty((n, n), dtype=dtype)
+        for start in range(0, n, chunk):
+            sources = [tuple(c) for c in cells[start:start + chunk]]
+            fields = bfs_distance_fields(self.open_mask, sources)
+            pairs[start:start + len(sources)] = fields[:, self.open_mask]
+        return pairs
+
+    def is_open(self, pos):
+        """True if pos is on the map and not a wall"""
+        x, y = pos
+        rows, cols = self.open_mask.shape
+        return 0 <= x < rows and 0 <= y < cols and bool(self.open_mask[x, y])
+
+    def distance_field(self, source):
+        """Exact distance field from source, cached"""
+        source = tuple(source)
+        if not self.is_open(source):
+            raise ValueError(f"{source} is off the map or a wall")
+        if source in self.fields:
+            return self.fields[source]
+        if source not in self._cache:
+            if len(self._cache) >= self.cache_size:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[source] = bfs_distance_field(self.open_mask, source)
+        return self._cache[source]
+
+    def distance(self, a, b):
+        """Exact number of steps between a and b, -1 if unreachable"""
+        a, b = tuple(a), tuple(b)
+        # Negative indexes would wrap around in numpy
+        if not (self.is_open(a) and self.is_open(b)):
+            return -1
+        if self.pairs is not None:
+            i, j = self.cell_index[a], self.cell_index[b]
+            if i < 0 or j < 0:
+                return -1
+            return int(self.pairs[i, j])
+        if b in self.fields and a not in self.fields:
+            a, b = b, a
+        return int(self.distance_field(a)[b])
+
+    def distance_bounds(self, a, b):
+        """Landmark (lower, upper) bounds on distance(a, b) without any BFS"""
+        if not (self.is_open(a) and self.is_open(b)):
+            return -1, -1
+        da = self.landmark_fields[:, a[0], a[1]]
+        db = self.landmark_fields[:, b[0], b[1]]
+        valid = (da >= 0) & (db >= 0)
+        if not valid.any():
+            return -1, -1
+        da, db = da[valid], db[valid]
+        return int(np.abs(da - db).max()), int((da + db).min())
+
+    def flag_distance(self, pos):
+        """Steps from pos to the flag, handy as a shaped-reward potential"""
+        if not self.is_open(pos):
+            return -1
+        return int(self.flag_field[pos[0], pos[1]])
+
+    def flag_distances(self):
+        """Steps from each agent's spawn to the flag"""
+        return {agent_id: self.flag_distance(pos) for agent_id, pos in self.spawns.items()}
+
+    def flag_asymmetry(self):
+        """How much closer the luckiest spawn is to the flag than the unluckiest"""
+        distances = list(self.flag_distances().values())
+        return max(distances) - min(distances)
@@ -2,20 +2,144 @@ import random
 from collections import deque
 
 class GridWorld:
-    def __init__(self, grid_size=(10, 10), wall_percentage=0.2):
+    def __init__(self, grid_size=(10, 10), wall_percentage=0.2, num_agents=2, precompute_distances=False,
+                 max_turns=None, seal_pockets=False):
+        self.setup_map(grid_size, wall_percentage, num_agents, max_turns, seal_pockets)
+
+        for agent_id in range(1, num_agents + 1):
+            spawn = self.random_position(exclude=list(self.agent_positions.values()))
+            self.set_agent_pos(agent_id, spawn)
+
+        self.flag_pos = self.random_position(exclude=list(self.agent_positions.values()))
+
+        # Place walls
+        self.place_walls()
+        self.reroll_stuck_spawns()
+        self.finish_map(precompute_distances)
+
+    @classmethod
+    def from_pool(cls, path, index, precompute_distances=False, max_turns=None):
+        """Load map number index from a pool written by envs.map_pool"""
+        from .map_pool import open_pool
+
+        pool = open_pool(path)
+        spawns, flag_pos, walls = pool.read(index)
+
+        # Pool maps were checked for connectivity when they were generated
+        game = cls.__new__(cls)
+        game.setup_map(pool.grid_size, pool.wall_percentage, len(spawns), max_turns, seal_pockets=False)
+
+        for agent_id, spawn in enumerate(spawns, 1):
+            game.set_agent_pos(agent_id, spawn)
+        game.flag_pos = flag_pos
+
+        for x, y in walls:
+            game.grid[x][y] = 'wall'
+        game.walls = walls
+        game.finish_map(precompute_distances)
+        return game
+
+    def reroll_stuck_spawns(self):
+        # Nobody should lose before making a move: respawn anyone boxed in
+        # until every agent has somewhere to go
+        stuck = [agent_id for agent_id in self.agent_positions if self.is_stuck(agent_id)]
+        while stuck:
+            agent_id = stuck[0]
+            pos = self.random_position(exclude=list(self.agent_positions.values()) + [self.flag_pos])
+            if self.grid[pos[0]][pos[1]] != 'wall':
+                self.set_agent_pos(agent_id, pos)
+                stuck = [agent_id for agent_id in self.agent_positions if self.is_stuck(agent_id)]
+
+    def setup_map(self, grid_size, wall_percentage, num_agents, max_turns, seal_pockets):
+        # Everything both constructors need before spawns, flag and walls go in
         self.grid_size = grid_size
         self.wall_percentage = wall_percentage
+        self.num_agents = num_agents
+        self.max_turns = max_turns if max_turns is not None else 2 * grid_size[0] * grid_size[1]
+        # Large random maps are almost never fully connected, so rather than
+        # retrying forever, wall off pockets the agents and flag can't reach
+        self.seal_pockets = seal_pockets
         self.grid = [['empty' for _ in range(grid_size[1])] for _ in range(grid_size[0])]
-        self.agent1_pos = self.random_position()
-        self.agent2_pos = self.random_position(exclude=[self.agent1_pos])
-        self.flag_pos = self.random_position(exclude=[self.agent1_pos, self.agent2_pos])
+        self.walls = []
+        self.spawn_positions = {}
+        self.distance_oracle = None
+
+        # Agent positions by id, plus a cell -> agent id index so collision,
+        # adjacency and stuck checks don't have to scan every agent
+        self.agent_positions = {}
+        self.occupancy = {}
+        self.stuck_agents = None  # filled in once the walls are placed
+
+    def finish_map(self, precompute_distances):
+        # Spawns, flag and walls are in place; the map never changes after
+        # this, so its geometry can be cached
+        self.spawn_positions = {agent_id: list(pos) for agent_id, pos in self.agent_positions.items()}
+        self.refresh_stuck_agents()
+        self.reset_match_state()
+        if precompute_distances:
+            self.build_distance_oracle()
+
+    def reset_match_state(self):
         self.turn = 0
         self.turns = 0
-        self.scores = {1: 0, 2: 0}
+        self.scores = {agent_id: 0 for agent_id in self.agent_positions}
         self.game_end_reason = None  # New: reason the game ended
+        self.game_over = False
+        # A spawn can already be stuck or the game otherwise over
+        self.resolve_game_over()
 
-        # Place walls
-        self.place_walls()
+    @property
+    def agent1_pos(self):
+        return self.agent_positions[1]
+
+    @agent1_pos.setter
+    def agent1_pos(self, pos):
+        self.set_agent_pos(1, pos)
+
+    @property
+    def agent2_pos(self):
+        return self.agent_positions[2]
+
+    @agent2_pos.setter
+    def agent2_pos(self, pos):
+        self.set_agent_pos(2, pos)
+
+    def set_agent_pos(self, agent_id, pos):
+        old_pos = self.agent_positions.get(agent_id)
+        if old_pos is not None and self.occupancy.get(tuple(old_pos)) == agent_id:
+            del self.occupancy[tuple(old_pos)]
+        self.occupancy[tuple(pos)] = agent_id
+        self.agent_positions[agent_id] = pos
+
+        if self.stuck_agents is not None:
+            self.update_stuck_near(agent_id, old_pos, pos)
+            # Only a move can capture the flag or trap someone
+            self.resolve_game_over()
+
+    def refresh_stuck_agents(self):
+        self.stuck_agents = {agent_id for agent_id in self.agent_positions if self.is_stuck(agent_id)}
+
+    def update_stuck_near(self, agent_id, old_pos, new_pos):
+        # Only the mover and agents next to the cell it left or entered can
+        # have changed stuck status
+        affected = {agent_id}
+        for cell in (old_pos, new_pos):
+            if cell is None:
+                continue
+            x, y = cell
+            for neighbor in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                other_id = self.occupancy.get(neighbor)
+                if other_id is not None:
+                    affected.add(other_id)
+
+        for other_id in affected:
+            if self.is_stuck(other_id):
+                self.stuck_agents.add(other_id)
+            else:
+                self.stuck_agents.discard(other_id)
+
+    def current_agent(self):
+        return self.turn + 1
 
     def random_position(self, exclude=[]):
         while True:
@@ -27,37 +151,76 @@ class GridWorld:
     def place_walls(self):
         num_walls = int(self.grid_size[0] * self.grid_size[1] * self.wall_percentage)
         walls = []
+        exclude = list(self.agent_positions.values()) + [self.flag_pos]
 
         for _ in range(num_walls):
-            x, y = self.random_position(exclude=[self.agent1_pos, self.agent2_pos, self.flag_pos])
+            x, y = self.random_position(exclude=exclude)
             walls.append((x, y))
             self.grid[x][y] = 'wall'
 
-        if not self.is_connected():
+        connected = self.seal_unreachable(walls) if self.seal_pockets else self.is_connected()
+        if not connected:
             self.grid = [['empty' for _ in range(self.grid_size[1])] for _ in range(self.grid_size[0])]
             self.place_walls()
         else:
             self.walls = walls
 
-    def is_connected(self):
-        start = self.agent1_pos
-        visited = set()
-        queue = deque([start])
-        visited.add(tuple(start))
+    def build_distance_oracle(self, **kwargs):
+        # numpy is only needed when distances are actually requested
+        from .distance_oracle import DistanceOracle
+
+        self.distance_oracle = DistanceOracle(
+            self.grid, self.flag_pos, self.spawn_positions,
+            **kwargs
+        )
+        return self.distance_oracle
+
+    def reachable_cells(self):
+        # Cells reachable from agent 1, as a flat x * cols + y bytearray;
+        # a set of tuples costs hundreds of MB on million-cell maps
+        cols = self.grid_size[1]
+        visited = bytearray(self.grid_size[0] * cols)
+        x, y = self.agent1_pos
+        visited[x * cols + y] = 1
+        queue = deque([(x, y)])
 
         while queue:
             x, y = queue.popleft()
             for nx, ny in self.get_neighbors([x, y]):
-                if self.grid[nx][ny] != 'wall' and (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    queue.append([nx, ny])
+                if not visited[nx * cols + ny]:
+                    visited[nx * cols + ny] = 1
+                    queue.append((nx, ny))
+        return visited
+
+    def is_connected(self):
+        visited = self.reachable_cells()
+        cols = self.grid_size[1]
 
         for x in range(self.grid_size[0]):
-            for y in range(self.grid_size[1]):
-                if self.grid[x][y] != 'wall' and (x, y) not in visited:
+            row = self.grid[x]
+            for y in range(cols):
+                if row[y] != 'wall' and not visited[x * cols + y]:
                     return False
         return True
 
+    def seal_unreachable(self, walls):
+        # Turn every cell agent 1 can't reach into a wall, as long as the
+        # other agents and the flag are reachable; False means start over
+        visited = self.reachable_cells()
+        cols = self.grid_size[1]
+
+        for x, y in list(self.agent_positions.values()) + [self.flag_pos]:
+            if not visited[x * cols + y]:
+                return False
+
+        for x in range(self.grid_size[0]):
+            row = self.grid[x]
+            for y in range(cols):
+                if row[y] != 'wall' and not visited[x * cols + y]:
+                    row[y] = 'wall'
+                    walls.append((x, y))
+        return True
+
     def get_neighbors(self, pos):
         x, y = pos
         neighbors = []
@@ -72,13 +235,33 @@ class GridWorld:
         return neighbors
 
     def get_state(self):
-        return {
-            'agent1_pos': self.agent1_pos,
-            'agent2_pos': self.agent2_pos,
+        state = {f'agent{agent_id}_pos': pos for agent_id, pos in self.agent_positions.items()}
+        state.update({
             'flag_pos': self.flag_pos,
             'turn': self.turn,
             'gridsize': self.grid_size
-        }
+        })
+        return state
+
+    def get_observation(self, agent_id):
+        # What agent_id is allowed to see: its own position, the local
+        # neighbourhood, and nothing about the other agents or the flag.
+        # Built from the acting agent alone so it costs the same for any N.
+        pos = self.agent_positions[agent_id]
+        state = {}
+        if self.num_agents == 2:
+            # Older agents look themselves up by seat
+            state['agent1_pos'] = pos if agent_id == 1 else [-1, -1]
+            state['agent2_pos'] = pos if agent_id == 2 else [-1, -1]
+        state.update({
+            'flag_pos': [-1, -1],
+            'turn': self.turn,
+            'gridsize': self.grid_size,
+            # Seat-independent key so agents work in any seat of an N-agent game
+            'my_pos': pos,
+            'adjacent_info': self.get_adjacent_info(pos, agent_id)
+        })
+        return state
 
     def get_adjacent_info(self, pos, agent_id):
         x, y = pos
@@ -91,10 +274,9 @@ class GridWorld:
         return adjacent_info
 
     def get_tile_info(self, x, y):
-        if [x, y] == self.agent1_pos:
-            return 'agent1'
-        elif [x, y] == self.agent2_pos:
-            return 'agent2'
+        agent_id = self.occupancy.get((x, y))
+        if agent_id is not None:
+            return f'agent{agent_id}'
         elif [x, y] == self.flag_pos:
             return 'flag'
         elif self.grid[x][y] == 'wall':
@@ -103,15 +285,7 @@ class GridWorld:
             return 'empty'
 
     def apply_action(self, agent, action):
-        if agent == 1:
-            pos = self.agent1_pos
-            opponent_pos = self.agent2_pos
-            opponent_id = 2
-        else:
-            pos = self.agent2_pos
-            opponent_pos = self.agent1_pos
-            opponent_id = 1
-
+        pos = self.agent_positions[agent]
         original_pos = pos.copy()
         new_pos = pos.copy()
         moved = False
@@ -142,28 +316,25 @@ class GridWorld:
         if action != 'stay' and not moved:
             self.scores[agent] -= 1.5
 
-        if new_pos == opponent_pos:
-            self.scores[opponent_id] += 5
+        occupant = self.occupancy.get(tuple(new_pos))
+        if occupant is not None and occupant != agent:
+            self.scores[occupant] += 5
             return
 
         if new_pos != original_pos:
             self.scores[agent] -= 1
-            if agent == 1:
-                self.agent1_pos = new_pos
-            else:
-                self.agent2_pos = new_pos
+            self.set_agent_pos(agent, new_pos)
 
         if new_pos == self.flag_pos:
             self.scores[agent] += 50
             #self.game_end_reason = f"agent{agent} captured the flag"
 
     def is_stuck(self, agent_id):
-        if agent_id == 1:
-            x, y = self.agent1_pos
-            opponent_pos = self.agent2_pos
-        else:
-            x, y = self.agent2_pos
-            opponent_pos = self.agent1_pos
+        x, y = self.agent_positions[agent_id]
+        # In a head-to-head game the opponent can trap you. With more agents
+        # the others keep moving, and one boxed-in seat shouldn't end the
+        # free-for-all, so only walls and edges count.
+        agents_block = self.num_agents == 2
 
         directions = [
             (x - 1, y), (x + 1, y),
@@ -172,37 +343,51 @@ class GridWorld:
 
         for nx, ny in directions:
             if 0 <= nx < self.grid_size[0] and 0 <= ny < self.grid_size[1]:
-                if self.grid[nx][ny] != 'wall' and [nx, ny] != opponent_pos:
+                if self.grid[nx][ny] != 'wall' and not (agents_block and (nx, ny) in self.occupancy):
                     return False
         return True
 
     def is_game_over(self):
-        if self.agent1_pos == self.flag_pos:
-            self.game_end_reason = "Agent1 captured the flag"
-            return True
-        if self.agent2_pos == self.flag_pos:
-            self.game_end_reason = "Agent2 captured the flag"
-            return True
+        # Settled by set_agent_pos and switch_turn as the state changes, so
+        # this is O(1) and has no side effects; call it as often as you like
+        return self.game_over
 
-        if self.turns > 2 * self.grid_size[0] * self.grid_size[1]:
-            self.game_end_reason = "Turn limit reached"
+    def resolve_game_over(self):
+        # Flag, then turn limit, then stuck agents. Stuck agents are tracked
+        # as they move, so this is O(1) too. Moves are settled before the
+        # turn counter advances, so a trap made on the last half-turn now
+        # ends the game as stuck rather than as the turn limit.
+        if self.game_over:
             return True
 
-        if self.is_stuck(1):
-            self.scores[2] += 100
-            self.game_end_reason = "Agent1 is stuck"
-            return True
+        flag_holder = self.occupancy.get(tuple(self.flag_pos))
+        if flag_holder is not None:
+            return self.end_game(f"Agent{flag_holder} captured the flag")
 
-        if self.is_stuck(2):
-            self.scores[1] += 100
-            self.game_end_reason = "Agent2 is stuck"
-            return True
+        if self.turns > self.max_turns:
+            return self.end_game("Turn limit reached")
+
+        if self.stuck_agents:
+            agent_id = min(self.stuck_agents)
+            # Everyone else gets the trap bonus
+            for other_id in self.scores:
+                if other_id != agent_id:
+                    self.scores[other_id] += 100
+            return self.end_game(f"Agent{agent_id} is stuck")
 
         return False
 
+    def end_game(self, reason):
+        self.game_over = True
+        self.game_end_reason = reason
+        return True
+
     def switch_turn(self):
-        self.turn = 1 - self.turn
+        self.turn = (self.turn + 1) % self.num_agents
         if self.turn == 0:
             self.turns += 1
+        # Moves settle the flag and stuck agents; only the turn limit is left
+        if not self.game_over and self.turns > self.max_turns:
+            self.end_game("Turn limit reached")
 
 
@@ -0,0 +1,155 @@
+"""Pre-generated GridWorld maps in one fixed-record binary file.
+
+Layout (little endian):
+    header: magic, rows, cols, num_agents, wall_percentage, count, record_size
+    record: (num_agents + 1) uint16 (x, y) pairs -- the spawns, then the flag --
+            followed by a row-major wall bitmap, one bit per cell
+
+Generate a pool once:
+    python -m envs.map_pool maps.bin --count 100000 --workers 8
+
+then load maps with GridWorld.from_pool("maps.bin", index). Every process
+maps the same file, so the pages are shared through the OS page cache.
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+from multiprocessing import Pool
+
+from .gridworld import GridWorld
+
+MAGIC = b'CTFPOOL1'
+HEADER = struct.Struct('<8sIIIdII')
+
+_open_pools = {}
+
+
+def record_size(grid_size, num_agents):
+    rows, cols = grid_size
+    return (num_agents + 1) * 4 + (rows * cols + 7) // 8
+
+
+def pack_record(game):
+    rows, cols = game.grid_size
+    positions = [game.agent_positions[agent_id] for agent_id in sorted(game.agent_positions)]
+    positions.append(game.flag_pos)
+    coords = [c for pos in positions for c in pos]
+
+    bitmap = bytearray((rows * cols + 7) // 8)
+    for x in range(rows):
+        row = game.grid[x]
+        for y in range(cols):
+            if row[y] == 'wall':
+                i = x * cols + y
+                bitmap[i >> 3] |= 1 << (i & 7)
+
+    return struct.pack(f'<{len(coords)}H', *coords) + bytes(bitmap)
+
+
+def _generate_record(args):
+    index, grid_size, wall_percentage, num_agents, seed = args
+    if seed is not None:
+        # Seed from both values so nearby seeds don't give shifted copies
+        random.seed(f'{seed}:{index}')
+    game = GridWorld(grid_size=grid_size, wall_percentage=wall_percentage, num_agents=num_agents)
+    return pack_record(game)
+
+
+def write_pool(path, count, grid_size=(10, 10), wall_percentage=0.2, num_agents=2, seed=None, workers=1):
+    """Generate count valid maps into path, using several processes if asked"""
+    grid_size = tuple(grid_size)
+    size = record_size(grid_size, num_agents)
+    jobs = ((i, grid_size, wall_percentage, num_agents, seed) for i in range(count))
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, grid_size[0], grid_size[1], num_agents, wall_percentage, count, size))
+        if workers > 1:
+            with Pool(workers) as pool:
+                for record in pool.imap(_generate_record, jobs, chunksize=64):
+                    f.write(record)
+        else:
+            # Reseeding per map would otherwise clobber the caller's RNG
+            saved_state = random.getstate() if seed is not None else None
+            try:
+                for job in jobs:
+                    f.write(_generate_record(job))
+            finally:
+                if saved_state is not None:
+                    random.setstate(saved_state)
+
+
+class MapPool:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, rows, cols, num_agents, wall_percentage, count, size = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a map pool file")
+        if size != record_size((rows, cols), num_agents) or len(self.mm) < HEADER.size + count * size:
+            raise ValueError(f"{path} is truncated or corrupt")
+
+        self.grid_size = (rows, cols)
+        self.num_agents = num_agents
+        self.wall_percentage = wall_percentage
+        self.count = count
+        self.record_size = size
+        self._positions = struct.Struct(f'<{(num_agents + 1) * 2}H')
+
+    def __len__(self):
+        return self.count
+
+    def read(self, index):
+        """Return (spawns, flag_pos, walls) for map number index"""
+        if not 0 <= index < self.count:
+            raise IndexError(f"map index {index} out of range for pool of {self.count}")
+
+        offset = HEADER.size + index * self.record_size
+        coords = self._positions.unpack_from(self.mm, offset)
+        positions = [[coords[i], coords[i + 1]] for i in range(0, len(coords), 2)]
+
+        cols = self.grid_size[1]
+        start = offset + self._positions.size
+        walls = []
+        with memoryview(self.mm) as view:
+            bitmap = view[start:start + self.record_size - self._positions.size]
+            for byte_index, byte in enumerate(bitmap):
+                while byte:
+                    bit = byte & -byte
+                    i = byte_index * 8 + bit.bit_length() - 1
+                    walls.append((i // cols, i % cols))
+                    byte ^= bit
+            bitmap.release()
+
+        return positions[:-1], positions[-1], walls
+
+
+def open_pool(path):
+    """Open a pool once per process and keep the mapping around"""
+    key = os.path.abspath(path)
+    if key not in _open_pools:
+        _open_pools[key] = MapPool(path)
+    return _open_pools[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate a pool of GridWorld maps")
+    parser.add_argument('path')
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--grid-size', type=int, nargs=2, default=[10, 10], metavar=('ROWS', 'COLS'))
+    parser.add_argument('--wall-percentage', type=float, default=0.2)
+    parser.add_argument('--num-agents', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    write_pool(args.path, args.count, args.grid_size, args.wall_percentage,
+               args.num_agents, args.seed, args.workers)
+    print(f"Wrote {args.count} maps to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
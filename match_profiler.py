@@ -0,0 +1,125 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from collections import defaultdict
+
+# GridWorld methods timed per call; nested ones (is_stuck inside
+# apply_action, get_adjacent_info inside get_observation) are counted in
+# their callers' totals too. apply_action is where the game end is settled.
+GAME_PHASES = ('is_game_over', 'is_stuck', 'get_state', 'get_observation', 'get_adjacent_info', 'apply_action',
+               'switch_turn')
+
+
+class MatchProfiler:
+    """Opt-in timing for run_match.
+
+    Nothing in the match loop knows about the profiler: instrument() swaps
+    timed wrappers onto the game and agent instances, so matches run
+    without a profiler pay nothing. Every sample_every-th match can also
+    be run under cProfile and/or tracemalloc.
+    """
+
+    def __init__(self, sample_every=0, use_cprofile=True, use_tracemalloc=False,
+                 output_dir='profiles', top_allocations=20):
+        self.sample_every = sample_every
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.output_dir = output_dir
+        self.top_allocations = top_allocations
+
+        self.total_ns = defaultdict(int)
+        self.calls = defaultdict(int)
+        self.matches = 0
+        self.pstats_files = []
+        self.allocations = []
+
+        self._cprofile = None
+        self._tracing = False
+
+    def timed(self, name, func):
+        total_ns = self.total_ns
+        calls = self.calls
+        clock = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                total_ns[name] += clock() - start
+                calls[name] += 1
+        return wrapper
+
+    def instrument(self, game, agents):
+        for name in GAME_PHASES:
+            setattr(game, name, self.timed(name, getattr(game, name)))
+        for agent_id, agent in agents.items():
+            agent.get_action = self.timed(f'agent{agent_id}.get_action', agent.get_action)
+
+    def start_match(self):
+        self.matches += 1
+        if not self.sample_every or self.matches % self.sample_every:
+            return
+
+        if self.use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def end_match(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f'match_{self.matches}.pstats')
+            self._cprofile.dump_stats(path)
+            self.pstats_files.append(path)
+            self._cprofile = None
+
+        if self._tracing:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self._tracing = False
+            self.allocations.append({
+                'match': self.matches,
+                'top': [
+                    {'location': str(stat.traceback), 'size_kb': stat.size / 1024, 'count': stat.count}
+                    for stat in snapshot.statistics('lineno')[:self.top_allocations]
+                ]
+            })
+
+    def summary(self):
+        phases = {}
+        for name in sorted(self.total_ns, key=self.total_ns.get, reverse=True):
+            total = self.total_ns[name]
+            calls = self.calls[name]
+            phases[name] = {
+                'calls': calls,
+                'total_ms': total / 1e6,
+                'mean_us': total / calls / 1e3 if calls else 0.0
+            }
+        return {
+            'matches': self.matches,
+            'phases': phases,
+            'pstats_files': self.pstats_files,
+            'tracemalloc': self.allocations
+        }
+
+    def write_results(self):
+        """Write summary.json, plus combined.pstats if any match was cProfiled"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+        if self.pstats_files:
+            stats = pstats.Stats(*self.pstats_files)
+            stats.dump_stats(os.path.join(self.output_dir, 'combined.pstats'))
+
+    def print_summary(self):
+        print(f"Profiled {self.matches} matches")
+        for name, phase in self.summary()['phases'].items():
+            print(f"  {name:<24} {phase['calls']:>10} calls {phase['total_ms']:>12.2f} ms {phase['mean_us']:>10.2f} us/call")
@@ -0,0 +1,299 @@
+"""Asyncio match host that keeps many GridWorld games in flight at once.
+
+Each seat is an async endpoint: an in-process agent run on a thread pool,
+or an external agent process reached over a Unix socket (see serve_agent).
+Turns from different games interleave as replies arrive, so one slow
+agent doesn't hold up the others.
+
+    python match_server.py host agents/blaute3.py agents/random_agent.py --games 500
+    python match_server.py serve-agent /tmp/blaute3.sock agents/blaute3.py
+    python match_server.py host unix:/tmp/blaute3.sock agents/random_agent.py
+"""
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from envs.gridworld import GridWorld
+from agents.loader import load_agent_from_file
+
+# What a seat plays when it doesn't answer within the turn timeout
+TIMEOUT_ACTION = 'stay'
+
+
+class InProcessSeat:
+    """Runs the agent on a thread pool.
+
+    The turn timeout starts when the agent call actually starts on a
+    thread, not when it is queued, so a pool kept busy by slow agents in
+    other games never costs this seat a turn. A call given up on while
+    still queued is cancelled; one still running past its timeout is
+    tracked in overruns, if given.
+    """
+
+    def __init__(self, agent, executor=None, overruns=None):
+        self.agent = agent
+        self.executor = executor
+        self.overruns = overruns
+        self._pending = None
+
+    @classmethod
+    def from_file(cls, path, executor=None, overruns=None):
+        return cls(load_agent_from_file(path), executor, overruns)
+
+    async def get_action(self, state, agent_id, timeout):
+        loop = asyncio.get_running_loop()
+        # A thread can't be cancelled, so a call that overran its turn has
+        # to finish (within this turn's time) before the agent is asked again
+        if self._pending is not None and not self._pending.done():
+            await asyncio.wait_for(asyncio.shield(self._pending), timeout)
+
+        started = asyncio.Event()
+        # Taken by whichever comes first: the thread starting the agent, or
+        # this turn giving up on the call while it is still queued
+        claim = threading.Lock()
+
+        def call():
+            if not claim.acquire(blocking=False):
+                return TIMEOUT_ACTION
+            loop.call_soon_threadsafe(started.set)
+            return self.agent.get_action(state, agent_id)
+
+        pending = self._pending = loop.run_in_executor(self.executor, call)
+        try:
+            await started.wait()
+            return await asyncio.wait_for(asyncio.shield(pending), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Timed out, or the whole game hit its deadline
+            if claim.acquire(blocking=False):
+                # Never started, and now it never will
+                pending.cancel()
+            elif self.overruns is not None and not pending.done():
+                self.overruns.add(pending)
+                pending.add_done_callback(self.overruns.discard)
+            raise
+
+    async def close(self):
+        pass
+
+
+class SocketSeat:
+    """Talks to serve_agent over a Unix socket, one JSON line per turn"""
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.seq = 0
+
+    async def get_action(self, state, agent_id, timeout):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+
+        self.seq += 1
+        request = {'seq': self.seq, 'agent_id': agent_id, 'state': state}
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return await asyncio.wait_for(self._read_reply(), timeout)
+
+    async def _read_reply(self):
+        # Replies to turns that already timed out are skipped
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError(f"agent at {self.path} closed the connection")
+            reply = json.loads(line)
+            if reply.get('seq') == self.seq:
+                return reply.get('action')
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+
+class MatchServer:
+    """Runs submitted games with bounded concurrency.
+
+    At most max_concurrent_games play at once and at most max_pending wait
+    in the queue; submit() blocks beyond that. Each turn gets turn_timeout
+    seconds of agent running time and each game game_deadline seconds in
+    total.
+    """
+
+    def __init__(self, max_concurrent_games=256, max_pending=1024, turn_timeout=1.0,
+                 game_deadline=60.0, executor_workers=32):
+        self.max_concurrent_games = max_concurrent_games
+        self.turn_timeout = turn_timeout
+        self.game_deadline = game_deadline
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers)
+
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.workers = []
+        self.games_played = 0
+        self.turn_timeouts = 0
+        self.deadlines_hit = 0
+        # Agent calls whose thread is still running after their turn timed out
+        self.overruns = set()
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def start(self):
+        for _ in range(self.max_concurrent_games):
+            self.workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, game, seats):
+        """Queue a game; returns a future that resolves to its result"""
+        result = asyncio.get_running_loop().create_future()
+        await self.queue.put((game, seats, result))
+        return result
+
+    async def _worker(self):
+        while True:
+            game, seats, result = await self.queue.get()
+            try:
+                outcome = await self.play_game(game, seats)
+                if not result.cancelled():
+                    result.set_result(outcome)
+            except Exception as e:
+                if not result.cancelled():
+                    result.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    @property
+    def overrunning_threads(self):
+        return len(self.overruns)
+
+    async def play_game(self, game, seats):
+        stats = {'turn_timeouts': 0}
+        try:
+            await asyncio.wait_for(self._play_turns(game, seats, stats), self.game_deadline)
+        except asyncio.TimeoutError:
+            self.deadlines_hit += 1
+            game.end_game("Game deadline reached")
+        finally:
+            for seat in seats.values():
+                await seat.close()
+
+        self.games_played += 1
+        return {
+            'scores': dict(game.scores),
+            'reason': game.game_end_reason,
+            'turns': game.turns,
+            'turn_timeouts': stats['turn_timeouts']
+        }
+
+    async def _play_turns(self, game, seats, stats):
+        while not game.is_game_over():
+            agent_id = game.current_agent()
+            state = game.get_observation(agent_id)
+            try:
+                action = await seats[agent_id].get_action(state, agent_id, self.turn_timeout)
+            except asyncio.TimeoutError:
+                self.turn_timeouts += 1
+                stats['turn_timeouts'] += 1
+                action = TIMEOUT_ACTION
+            game.apply_action(agent_id, action)
+            game.switch_turn()
+
+
+async def serve_agent(agent_path, socket_path):
+    """External agent process: one fresh Agent per connection (game seat)"""
+
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        agent = load_agent_from_file(agent_path)
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                action = await loop.run_in_executor(None, agent.get_action, request['state'], request['agent_id'])
+                writer.write(json.dumps({'seq': request['seq'], 'action': action}).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    print(f"Serving {agent_path} on {socket_path}")
+    async with server:
+        await server.serve_forever()
+
+
+def make_seat(spec, server):
+    if spec.startswith('unix:'):
+        return SocketSeat(spec[len('unix:'):])
+    return InProcessSeat.from_file(spec, server.executor, server.overruns)
+
+
+async def host(agent_specs, games, **server_options):
+    async with MatchServer(**server_options) as server:
+        results = []
+        for _ in range(games):
+            seats = {i + 1: make_seat(spec, server) for i, spec in enumerate(agent_specs)}
+            results.append(await server.submit(GridWorld(num_agents=len(seats)), seats))
+        results = await asyncio.gather(*results)
+
+    totals = {}
+    for result in results:
+        for agent_id, score in result['scores'].items():
+            totals[agent_id] = totals.get(agent_id, 0) + score
+    averages = ", ".join(f"Agent {i}: {total / games}" for i, total in totals.items())
+    print(f"Played {games} games ({server.turn_timeouts} turn timeouts, {server.deadlines_hit} deadlines hit, "
+          f"{server.overrunning_threads} agent threads still running past their timeout)")
+    print(f"Average Scores: {averages}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio GridWorld match host")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    host_parser = commands.add_parser('host', help="play many games concurrently")
+    host_parser.add_argument('agents', nargs='+', help="agent .py files or unix:/path/to/socket")
+    host_parser.add_argument('--games', type=int, default=100)
+    host_parser.add_argument('--concurrency', type=int, default=256)
+    host_parser.add_argument('--max-pending', type=int, default=1024)
+    host_parser.add_argument('--turn-timeout', type=float, default=1.0)
+    host_parser.add_argument('--game-deadline', type=float, default=60.0)
+    host_parser.add_argument('--threads', type=int, default=32)
+
+    serve_parser = commands.add_parser('serve-agent', help="expose one agent on a Unix socket")
+    serve_parser.add_argument('socket_path')
+    serve_parser.add_argument('agent')
+
+    args = parser.parse_args()
+    if args.command == 'host':
+        asyncio.run(host(
+            args.agents, args.games,
+            max_concurrent_games=args.concurrency,
+            max_pending=args.max_pending,
+            turn_timeout=args.turn_timeout,
+            game_deadline=args.game_deadline,
+            executor_workers=args.threads
+        ))
+    else:
+        asyncio.run(serve_agent(args.agent, args.socket_path))
+
+
+if __name__ == "__main__":
+    main()
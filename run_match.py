@@ -1,9 +1,8 @@
-import importlib.util
 import time
 import sys
 import pygame
 from envs.gridworld import GridWorld
-import os
+from agents.loader import load_agent_from_file
 
 # Define colors
 WHITE = (255, 255, 255)
@@ -13,22 +12,13 @@ GREEN = (0, 200, 0)
 BLUE = (0, 100, 255)
 BLACK = (0, 0, 0)
 
+# Colors for agents 3+ in multi-agent games
+AGENT_COLORS = [(255, 165, 0), (160, 32, 240), (0, 200, 200), (255, 105, 180)]
+
 CELL_SIZE = 50  # pixels
 MARGIN = 2      # pixels between cells
 
 
-def load_agent_from_file(filepath):
-    """Dynamically import the Agent class from a .py file"""
-    agent_dir = os.path.dirname(os.path.abspath(filepath))
-    if agent_dir not in sys.path:
-        sys.path.insert(0, agent_dir)
-
-    spec = importlib.util.spec_from_file_location("student_agent", filepath)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module.Agent()
-
-
 def draw_grid(screen, game,font):
     screen.fill(BLACK)
     rows, cols = game.grid_size
@@ -39,15 +29,20 @@ def draw_grid(screen, game,font):
             color = GRAY  # Default cell
             text = ""
 
+            agent_id = game.occupancy.get((row, col))
+
             if [row, col] == game.flag_pos:
                 color = RED
                 text = "F"
-            elif [row, col] == game.agent1_pos:
+            elif agent_id == 1:
                 color = GREEN
                 text = "A1"
-            elif [row, col] == game.agent2_pos:
+            elif agent_id == 2:
                 color = BLUE
                 text = "A2"
+            elif agent_id is not None:
+                color = AGENT_COLORS[(agent_id - 3) % len(AGENT_COLORS)]
+                text = f"A{agent_id}"
             elif (row, col) in game.walls:
                 color = BLACK
 
@@ -66,16 +61,35 @@ def draw_grid(screen, game,font):
                 screen.blit(text_surface, text_rect)
             
             # --- Draw Score and Turn Info ---
-            info_text = f"Turn: {game.turns} | Score A1: {game.scores[1]} | Score A2: {game.scores[2]}"
+            score_text = " | ".join(f"Score A{i}: {score}" for i, score in game.scores.items())
+            info_text = f"Turn: {game.turns} | {score_text}"
             text_surface = font.render(info_text, True, WHITE)
             screen.blit(text_surface, (10, rows * (CELL_SIZE + MARGIN) + 10))
 
 
-def run_match(agent1_path, agent2_path, visualize):
-    agent1 = load_agent_from_file(agent1_path)
-    agent2 = load_agent_from_file(agent2_path)
-
+def run_match(agent1_path, agent2_path, visualize, profiler=None):
+    agents = {
+        1: load_agent_from_file(agent1_path),
+        2: load_agent_from_file(agent2_path)
+    }
     game = GridWorld()
+    return play_match(game, agents, visualize, profiler)
+
+
+def run_multi_match(agent_paths, visualize=False, grid_size=(10, 10), wall_percentage=0.2, profiler=None):
+    """Free-for-all on one map: agent_paths[i] plays as agent i + 1"""
+    agents = {i + 1: load_agent_from_file(path) for i, path in enumerate(agent_paths)}
+    game = GridWorld(grid_size=grid_size, wall_percentage=wall_percentage, num_agents=len(agents))
+    return play_match(game, agents, visualize, profiler)
+
+
+def play_match(game, agents, visualize, profiler=None):
+    render = draw_grid
+    if profiler is not None:
+        profiler.instrument(game, agents)
+        render = profiler.timed('render', draw_grid)
+        profiler.start_match()
+
     state = game.get_state()
 
     if visualize:
@@ -102,43 +116,32 @@ def run_match(agent1_path, agent2_path, visualize):
             print("Could not focus window:", e)
 
         clock = pygame.time.Clock()
-        draw_grid(screen, game,font)
+        render(screen, game,font)
         pygame.display.flip()
         clock.tick(5)
 
     while not game.is_game_over():
-        state = game.get_state()
-
-        if game.turn == 0:
-            state['adjacent_info'] = game.get_adjacent_info(game.agent1_pos, 1)
-        else:
-            state['adjacent_info'] = game.get_adjacent_info(game.agent2_pos, 2)
-        
-        if game.turn == 0:
-            state['agent2_pos'] = [-1, -1]
-            state['flag_pos'] = [-1, -1]
-            action = agent1.get_action(state, 1)
-            if visualize:
-                print(f"Agent 1 Action: {action}")
-            game.apply_action(1, action)
-        else:
-            state['agent1_pos'] = [-1, -1]
-            state['flag_pos'] = [-1, -1]
-            action = agent2.get_action(state, 2)
-            if visualize:
-                print(f"Agent 2 Action: {action}")
-            game.apply_action(2, action)
+        agent_id = game.current_agent()
+        state = game.get_observation(agent_id)
+
+        action = agents[agent_id].get_action(state, agent_id)
+        if visualize:
+            print(f"Agent {agent_id} Action: {action}")
+        game.apply_action(agent_id, action)
 
         if visualize:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
-            draw_grid(screen, game,font)
+            render(screen, game,font)
             pygame.display.flip()
             clock.tick(5)
 
         game.switch_turn()
+
+    if profiler is not None:
+        profiler.end_match()
     print(game.game_end_reason)
     
     if visualize:
@@ -152,23 +155,28 @@ def run_match(agent1_path, agent2_path, visualize):
     #else:
     #    print("Max Turns!")
 
-    print(f"Final Scores: Agent 1: {game.scores[1]}, Agent 2: {game.scores[2]}, Turns: {game.turns}")
+    score_text = ", ".join(f"Agent {i}: {score}" for i, score in game.scores.items())
+    print(f"Final Scores: {score_text}, Turns: {game.turns}")
     return game.scores
 
 
-def main(agent1path, agent2path, visualize, battles):
+def main(agent1path, agent2path, visualize, battles, profiler=None):
     if battles == 1:
-        run_match(agent1path, agent2path, visualize)
+        run_match(agent1path, agent2path, visualize, profiler)
     else:
         agent1score = 0
         agent2score = 0
         for i in range(battles):
-            scores = run_match(agent1path, agent2path, visualize)
+            scores = run_match(agent1path, agent2path, visualize, profiler)
             agent1score += scores[1]
             agent2score += scores[2]
         print(f"Average Scores: Agent 1: {agent1score / battles}, Agent 2: {agent2score / battles}")
         print(f"Total Scores: Agent 1: {agent1score}, Agent 2: {agent2score}")
 
+    if profiler is not None:
+        profiler.print_summary()
+        profiler.write_results()
+
 
 if __name__ == "__main__":
     agent1path = "./agents/blaute3.py"
@@ -178,7 +186,12 @@ if __name__ == "__main__":
     
     visualize = True
     battles = 1
-    main(agent1path, agent2path, visualize, battles)
+
+    # Per-phase timing, with every 10th match under cProfile
+    profiler = None
+    #from match_profiler import MatchProfiler
+    #profiler = MatchProfiler(sample_every=10)
+    main(agent1path, agent2path, visualize, battles, profiler)
 
 
 
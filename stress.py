@@ -0,0 +1,288 @@
+"""Scaling stress mode: play matches on growing maps and report how the
+environment and each agent scale.
+
+Every grid size runs in a fresh process so peak RSS is per size. For each
+one we record map build time, peak RSS, tracemalloc top allocators split
+into environment vs each agent, environment cost per turn and each
+agent's get_action latency as a function of turn number. The summary
+flags anything that grows faster than it should.
+
+    python stress.py --sizes 10 100 500 1000 2000 --max-turns 2000 --json stress.json
+"""
+import argparse
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+from envs.gridworld import GridWorld
+from agents.loader import load_agent_from_file
+
+# Log-log slope above which cost vs map cells counts as superlinear
+SUPERLINEAR_SLOPE = 1.15
+# Environment cost per turn should not depend on map size at all
+ENV_TURN_SLOPE = 0.2
+# Agent latency vs turn number slope that points at O(explored cells) work
+TURN_GROWTH_SLOPE = 0.5
+# Fewer sizes than this and a slope across sizes is just noise
+MIN_SIZES_FOR_SLOPE = 3
+LATENCY_BUCKETS = 10
+
+
+def peak_rss():
+    """Peak resident set size of this process, in bytes"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def loglog_slope(points):
+    """Least-squares slope of log(y) against log(x)"""
+    logs = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(logs) < 2:
+        return None
+    mean_x = sum(x for x, _ in logs) / len(logs)
+    mean_y = sum(y for _, y in logs) / len(logs)
+    var = sum((x - mean_x) ** 2 for x, _ in logs)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in logs) / var
+
+
+def latency_growth(samples_ns):
+    """Mean latency per bucket of turns, plus how fast it grows with turn number"""
+    size = len(samples_ns) // LATENCY_BUCKETS
+    if size < 2:
+        return {'buckets': [], 'slope': None}
+
+    buckets = []
+    for b in range(LATENCY_BUCKETS):
+        chunk = samples_ns[b * size:(b + 1) * size]
+        buckets.append({'turn': b * size + size // 2 + 1, 'mean_us': sum(chunk) / len(chunk) / 1e3})
+    return {
+        'buckets': buckets,
+        'slope': loglog_slope([(b['turn'], b['mean_us']) for b in buckets])
+    }
+
+
+def top_allocators(snapshot, owners, limit):
+    """Group tracemalloc lines by which file allocated them, listing every seat using that file"""
+    by_path = {path: {'seats': seats, 'total_kb': 0.0, 'top': []} for path, seats in owners.items()}
+    for stat in snapshot.statistics('lineno'):
+        entry = by_path.get(os.path.abspath(stat.traceback[0].filename))
+        if entry is None:
+            continue
+        entry['total_kb'] += stat.size / 1024
+        if len(entry['top']) < limit:
+            entry['top'].append({'location': str(stat.traceback), 'size_kb': stat.size / 1024, 'count': stat.count})
+    return by_path
+
+
+def stress_match(config):
+    grid_size = tuple(config['grid_size'])
+    agent_paths = config['agent_paths']
+    random.seed(config['seed'])
+
+    rss_start = peak_rss()
+    if config['trace_memory']:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    game = GridWorld(
+        grid_size=grid_size,
+        wall_percentage=config['wall_percentage'],
+        num_agents=len(agent_paths),
+        max_turns=config['max_turns'],
+        seal_pockets=True
+    )
+    build_s = time.perf_counter() - start
+    rss_env = peak_rss()
+
+    agents = {i + 1: load_agent_from_file(path) for i, path in enumerate(agent_paths)}
+    latencies = {agent_id: [] for agent_id in agents}
+    env_ns = 0
+    clock = time.perf_counter_ns
+
+    while True:
+        t0 = clock()
+        if game.is_game_over():
+            env_ns += clock() - t0
+            break
+        agent_id = game.current_agent()
+        state = game.get_observation(agent_id)
+        t1 = clock()
+        action = agents[agent_id].get_action(state, agent_id)
+        t2 = clock()
+        game.apply_action(agent_id, action)
+        game.switch_turn()
+        env_ns += (t1 - t0) + (clock() - t2)
+        latencies[agent_id].append(t2 - t1)
+
+    result = {
+        'grid_size': list(grid_size),
+        'cells': grid_size[0] * grid_size[1],
+        'build_s': build_s,
+        'turns': game.turns,
+        'end_reason': game.game_end_reason,
+        'env_us_per_turn': env_ns / max(1, sum(map(len, latencies.values()))) / 1e3,
+        'rss_start_mb': rss_start / 2**20,
+        'rss_after_env_mb': rss_env / 2**20,
+        'peak_rss_mb': peak_rss() / 2**20,
+        'agents': {}
+    }
+
+    for agent_id, samples in latencies.items():
+        result['agents'][f'agent{agent_id}'] = {
+            'path': agent_paths[agent_id - 1],
+            'calls': len(samples),
+            'mean_us': sum(samples) / len(samples) / 1e3 if samples else 0.0,
+            'max_us': max(samples) / 1e3 if samples else 0.0,
+            'growth': latency_growth(samples)
+        }
+
+    if config['trace_memory']:
+        snapshot = tracemalloc.take_snapshot()
+        result['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        owners = {os.path.abspath(inspect.getfile(GridWorld)): ['environment']}
+        for agent_id, path in enumerate(agent_paths, 1):
+            owners.setdefault(os.path.abspath(path), []).append(f'agent{agent_id}')
+        result['allocators'] = top_allocators(snapshot, owners, config['top'])
+
+    return result
+
+
+def scaling_flags(results):
+    flags = []
+    by_cells = [r for r in results if r['cells'] > 0]
+
+    across_sizes = len({r['cells'] for r in by_cells}) >= MIN_SIZES_FOR_SLOPE
+
+    if across_sizes:
+        slope = loglog_slope([(r['cells'], r['build_s']) for r in by_cells])
+        if slope is not None and slope > SUPERLINEAR_SLOPE:
+            flags.append(f"map build time scales ~cells^{slope:.2f} (superlinear)")
+
+        # Interpreter and imports are resident before any map exists, so
+        # only fit what the match added on top of that
+        slope = loglog_slope([(r['cells'], r['peak_rss_mb'] - r['rss_start_mb']) for r in by_cells])
+        if slope is not None and slope > SUPERLINEAR_SLOPE:
+            flags.append(f"peak RSS growth scales ~cells^{slope:.2f} (superlinear)")
+
+        slope = loglog_slope([(r['cells'], r['env_us_per_turn']) for r in by_cells])
+        if slope is not None and slope > ENV_TURN_SLOPE:
+            flags.append(f"environment cost per turn scales ~cells^{slope:.2f}; it should be flat")
+
+    for name in results[0]['agents']:
+        path = results[0]['agents'][name]['path']
+        if across_sizes:
+            slope = loglog_slope([(r['cells'], r['agents'][name]['mean_us']) for r in by_cells])
+            if slope is not None and slope > SUPERLINEAR_SLOPE:
+                flags.append(f"{name} ({path}) mean latency scales ~cells^{slope:.2f} (superlinear)")
+
+        for r in results:
+            growth = r['agents'][name]['growth']['slope']
+            if growth is not None and growth > TURN_GROWTH_SLOPE:
+                rows, cols = r['grid_size']
+                flags.append(f"{name} ({path}) latency grows ~turn^{growth:.2f} on {rows}x{cols}; "
+                             f"likely O(explored cells) work per move")
+    return flags
+
+
+def print_report(results, flags):
+    print(f"{'grid':>11} {'cells':>10} {'build s':>9} {'env us/turn':>12} {'RSS env MB':>11} "
+          f"{'peak RSS MB':>12} {'traced MB':>10} {'turns':>7}  end")
+    for r in results:
+        rows, cols = r['grid_size']
+        traced = r.get('traced_peak_mb')
+        traced = f"{traced:10.1f}" if traced is not None else f"{'-':>10}"
+        print(f"{f'{rows}x{cols}':>11} {r['cells']:>10} {r['build_s']:>9.2f} {r['env_us_per_turn']:>12.2f} "
+              f"{r['rss_after_env_mb']:>11.1f} {r['peak_rss_mb']:>12.1f} {traced} {r['turns']:>7}  {r['end_reason']}")
+
+    print()
+    print("Agent get_action latency (mean us, growth slope vs turn number)")
+    for name in results[0]['agents']:
+        cells = []
+        for r in results:
+            agent = r['agents'][name]
+            slope = agent['growth']['slope']
+            slope = f"{slope:+.2f}" if slope is not None else "n/a"
+            cells.append(f"{r['grid_size'][0]}x{r['grid_size'][1]}: {agent['mean_us']:.1f} ({slope})")
+        print(f"  {name}: " + ", ".join(cells))
+
+    if 'allocators' in results[-1]:
+        rows, cols = results[-1]['grid_size']
+        print()
+        print(f"Top allocators on {rows}x{cols}")
+        for path, entry in results[-1]['allocators'].items():
+            print(f"  {', '.join(entry['seats'])} ({os.path.relpath(path)}): {entry['total_kb'] / 1024:.1f} MB")
+            for stat in entry['top'][:3]:
+                print(f"    {stat['size_kb'] / 1024:8.1f} MB  {stat['location']}")
+
+    print()
+    if len({r['cells'] for r in results}) < MIN_SIZES_FOR_SLOPE:
+        print(f"Fewer than {MIN_SIZES_FOR_SLOPE} grid sizes: skipped scaling across sizes")
+    if flags:
+        print("Scaling flags:")
+        for flag in flags:
+            print(f"  - {flag}")
+    else:
+        print("No superlinear scaling detected")
+
+
+def parse_size(text):
+    rows, _, cols = text.lower().partition('x')
+    return (int(rows), int(cols or rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GridWorld scaling stress test")
+    parser.add_argument('--agents', nargs='+', default=['./agents/blaute3.py', './agents/random_agent.py'])
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[(10, 10), (100, 100), (500, 500), (1000, 1000)],
+                        help="grid sizes like 500 or 300x800")
+    parser.add_argument('--wall-percentage', type=float, default=0.2)
+    parser.add_argument('--max-turns', type=int, default=None,
+                        help="cap on the turn limit (default: GridWorld's 2 * rows * cols)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top', type=int, default=10, help="allocators to keep per owner")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="skip allocation tracking (much faster)")
+    parser.add_argument('--json', help="also write the full results here")
+    args = parser.parse_args()
+
+    # --max-turns only ever lowers the usual limit, so small maps keep theirs
+    configs = [{
+        'grid_size': size,
+        'agent_paths': args.agents,
+        'wall_percentage': args.wall_percentage,
+        'max_turns': None if args.max_turns is None else min(args.max_turns, 2 * size[0] * size[1]),
+        'seed': args.seed,
+        'trace_memory': not args.no_tracemalloc,
+        'top': args.top
+    } for size in sorted(args.sizes, key=lambda s: s[0] * s[1])]
+
+    # A fresh process per size so peak RSS belongs to that size alone
+    results = []
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for config in configs:
+            rows, cols = config['grid_size']
+            print(f"Running {rows}x{cols}...", flush=True)
+            results.append(pool.apply(stress_match, (config,)))
+
+    flags = scaling_flags(results)
+    print()
+    print_report(results, flags)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results, 'flags': flags}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()